@@ -0,0 +1,274 @@
+"""컴활 요약집 OCR 파이프라인 공용 모듈.
+
+PDF 분할 개수 추천, 분할, Upstage OCR 호출, 결과 병합을 담당하며
+UI 스크립트(comst.py)에서 임포트해 사용한다.
+"""
+import io
+import os
+import json
+import math
+import time
+import random
+import functools
+import threading
+import requests
+import streamlit as st
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
+import ijson
+import fitz  # PyMuPDF
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson이 있으면 사용, 없으면 표준 json으로 동작
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+# 파일로 직접 기록 (orjson이면 디코딩 없이 바이트 그대로 쓴다)
+def json_dump_file(obj, path):
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+
+
+
+# 디렉토리 설정
+BASE_DIR = "./"
+UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+SPLIT_DIR = os.path.join(BASE_DIR, "splits")
+JSON_DIR = os.path.join(BASE_DIR, "jsons")
+RESULT_DIR = os.path.join(BASE_DIR, "results")
+
+# 작업 디렉토리는 프로세스당 한 번만 생성
+@functools.lru_cache(maxsize=1)
+def init_dirs():
+    for d in [UPLOAD_DIR, SPLIT_DIR, JSON_DIR, RESULT_DIR]:
+        os.makedirs(d, exist_ok=True)
+
+# secrets.toml에서 API 키 불러오기
+API_KEY = st.secrets["api"]["upstage_key"]
+OCR_URL = "https://api.upstage.ai/v1/document-digitization"
+HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+
+# 분할당 목표 업로드 크기 (MB)
+TARGET_MB = 8
+
+# 전체 동시 OCR 요청 상한 (스레드 풀 크기와 무관한 전역 제한)
+MAX_CONCURRENCY = 5
+_OCR_SEMAPHORE = threading.Semaphore(MAX_CONCURRENCY)
+
+
+# 토큰 버킷 방식 요청 속도 제한 (버스트로 인한 429 연쇄 방지)
+class RateLimiter:
+    def __init__(self, rps):
+        self.rps = rps
+        self._lock = threading.Lock()
+        self._next_allowed_ts = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._next_allowed_ts - now)
+            self._next_allowed_ts = max(self._next_allowed_ts, now) + 1 / self.rps
+        if delay:
+            time.sleep(delay)
+
+
+RATE_LIMITER = RateLimiter(float(st.secrets["api"].get("rps", 2.0)))
+
+# 연결 재사용(keep-alive) + 429/5xx 자동 재시도 세션
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        # 스트리밍 멀티파트 본문은 되감기가 안 되므로 어댑터는 아직 본문을 보내지 않은
+        # 연결 수준 오류만 재시도하고, 상태 코드(429/5xx) 재시도는
+        # 인코더를 매번 새로 만드는 call_api_until_success 루프가 담당한다
+        max_retries=Retry(
+            total=5,
+            connect=5,
+            read=0,
+            backoff_factor=2,
+            allowed_methods=["POST"],
+        ),
+    ),
+)
+
+# 고급 분할 개수 추천 함수 (mtime을 키에 포함해 파일이 바뀌면 재계산)
+@st.cache_data(show_spinner=False)
+def recommend_split_count_advanced(pdf_path, mtime):
+    file_size_mb = os.path.getsize(pdf_path) / (1024 * 1024)
+    doc = fitz.open(pdf_path)
+    total_pages = doc.page_count
+    avg_size_per_page = file_size_mb / total_pages if total_pages else 0
+
+    # 비율 구간(0.4 / 0.7)이 확정되는 즉시 스캔 중단
+    image_page_count = 0
+    for scanned, page in enumerate(doc, 1):
+        # 콘텐츠 스트림이 없는 페이지는 리소스 열람 없이 건너뜀
+        if page.get_contents() and page.get_images(full=False):
+            image_page_count += 1
+        lower = image_page_count / total_pages
+        upper = (image_page_count + total_pages - scanned) / total_pages
+        if lower > 0.7 or upper <= 0.4:
+            break
+    image_ratio = image_page_count / total_pages if total_pages else 0
+    doc.close()
+
+    # 페이지 수 기반 추정
+    page_based = min(15, max(1, total_pages // 10))
+    if avg_size_per_page > 1.5:
+        page_based += 2
+    elif avg_size_per_page > 1.0:
+        page_based += 1
+
+    # 업로드 크기 기반 추정: 분할당 TARGET_MB 수준으로 맞춰 요청 지연을 균등화
+    size_based = max(1, math.ceil(file_size_mb / TARGET_MB))
+
+    # 둘 중 큰 쪽을 택해 병렬 처리가 굶지 않도록 한다
+    recommended = max(page_based, size_based)
+
+    if image_ratio > 0.7:
+        recommended = int(recommended * 1.3)
+    elif image_ratio > 0.4:
+        recommended += 1
+
+    return min(recommended, total_pages)
+
+# PDF 분할 범위 계산
+def generate_split_ranges(total_pages, num_parts):
+    base = total_pages // num_parts
+    ranges = []
+    for i in range(num_parts):
+        start = i * base + 1
+        end = (i + 1) * base if i < num_parts - 1 else total_pages
+        ranges.append((start, end))
+    return ranges
+
+# 단일 분할 범위 기록 (프로세스는 핸들 공유가 안 되므로 파일을 직접 연다)
+def _write_range(input_path, output_path, start, end):
+    src = fitz.open(input_path)
+    dst = fitz.open()
+    dst.insert_pdf(src, from_page=start - 1, to_page=end - 1)
+    # garbage=3이면 분할 간 중복되는 공유 리소스(폰트/이미지)를 정리한다
+    dst.save(output_path, garbage=3, deflate=True, clean=True)
+    dst.close()
+    src.close()
+    return output_path
+
+
+# 페이지 수 조회 (rerun/재호출 시 xref 재파싱 방지)
+@st.cache_data(show_spinner=False)
+def get_page_count(pdf_path, mtime):
+    doc = fitz.open(pdf_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+# PDF 분할
+def split_pdf(input_path, output_dir, num_parts):
+    total_pages = get_page_count(input_path, os.path.getmtime(input_path))
+    if not total_pages:
+        return []
+    # 페이지 수 초과 분할은 (1, 0) 같은 퇴화 범위를 만들고, insert_pdf가
+    # to_page=-1을 '마지막 페이지'로 해석해 문서 전체 복사본이 돼 버린다
+    num_parts = min(num_parts, total_pages)
+    split_ranges = generate_split_ranges(total_pages, num_parts)
+    split_paths = [os.path.join(output_dir, f"split_{idx+1}.pdf") for idx in range(len(split_ranges))]
+    starts = [s for s, _ in split_ranges]
+    ends = [e for _, e in split_ranges]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        list(ex.map(_write_range, repeat(input_path), split_paths, starts, ends))
+    return split_paths
+
+# OCR API 호출 및 저장 (재시도 포함)
+# 워커 스레드에서 실행되므로 st 요소를 직접 그리지 않고
+# (성공 여부, 경고 메시지 목록)을 돌려주면 호출 측이 메인 스레드에서 렌더링한다
+def call_api_until_success(pdf_path, output_json_path, max_retries=5):
+    notes = []
+    # 재시도마다 디스크를 다시 읽지 않도록 한 번만 읽어 둔다
+    with open(pdf_path, "rb") as f:
+        buf = f.read()
+
+    for attempt in range(max_retries):
+        try:
+            # 멀티파트 본문을 통째로 복사하지 않고 버퍼에서 바로 스트리밍
+            enc = MultipartEncoder(fields={
+                "document": (os.path.basename(pdf_path), io.BytesIO(buf), "application/pdf"),
+                "ocr": "force",
+                "base64_encoding": "['table']",
+                "model": "document-parse",
+            })
+            RATE_LIMITER.wait()
+            with _OCR_SEMAPHORE:
+                response = SESSION.post(
+                    OCR_URL,
+                    headers={"Content-Type": enc.content_type},
+                    data=enc,
+                    timeout=(10, 300),
+                )
+
+            if response.status_code == 200:
+                result = json_loads(response.content)
+                json_dump_file(result, output_json_path)
+                return True, notes
+            if response.status_code in (429, 500, 502, 503, 504):
+                # 서버가 지정한 대기 시간을 우선하고, 없으면 지수 백오프 + 지터
+                notes.append(f"OCR 재시도 (status {response.status_code}, 시도 {attempt + 1}/{max_retries}): {os.path.basename(pdf_path)}")
+                retry_after = response.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after else min(60, (2 ** attempt) + random.uniform(0, 1))
+                time.sleep(delay)
+                continue
+            # 그 외 4xx는 영구 오류이므로 즉시 종료
+            notes.append(f"OCR 실패 (status {response.status_code}): {os.path.basename(pdf_path)}")
+            return False, notes
+        except Exception as e:
+            notes.append(f"예외 발생 (시도 {attempt + 1}/{max_retries}): {e}")
+            # 연결 예외는 지수 백오프 + 지터로 재시도
+            time.sleep(min(60, (2 ** attempt) + random.uniform(0, 1)))
+    return False, notes
+
+# JSON 병합: HTML 원문은 .html 파일로 직접 쓰고 JSON에는 경로만 남긴다
+# (거대한 문자열의 JSON 이스케이프/역이스케이프 왕복을 생략)
+def merge_jsons(input_dir, output_path):
+    html_path = os.path.splitext(output_path)[0] + ".html"
+    with open(html_path, "w", encoding="utf-8") as out:
+        entries = sorted(
+            (e for e in os.scandir(input_dir) if e.is_file() and e.name.endswith(".json")),
+            key=lambda e: e.name,
+        )
+        for entry in entries:
+            found = False
+            with open(entry.path, "rb") as f:
+                for html in ijson.items(f, "content.html"):
+                    out.write(html)
+                    out.write("\n")
+                    found = True
+            if not found:
+                st.warning(f"HTML 누락: {entry.name}")
+    json_dump_file({"api": "2.0", "content": {"html_path": html_path}}, output_path)
+    return output_path